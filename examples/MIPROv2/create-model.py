@@ -1,38 +1,87 @@
+import os
+import numpy as np
+import onnx
+import onnxruntime as ort
 import torch
 import torch.nn as nn
+from onnxconverter_common.float16 import convert_float_to_float16
 from torch.onnx import export
+from onnx_utils import create_session, optimize_onnx_model, outputs_match, quantize
 
 class SimpleTextGenerator(nn.Module):
     def __init__(self, input_size=256, hidden_size=512, output_size=256):
         super().__init__()
         self.lstm = nn.LSTM(input_size, hidden_size, batch_first=True)
         self.fc = nn.Linear(hidden_size, output_size)
-        
+
     def forward(self, x):
         lstm_out, _ = self.lstm(x)
         output = self.fc(lstm_out[:, -1, :])
         return output
 
+def convert_to_fp16(src, dst, sample_inputs):
+    # Float16 LSTM only has a GPU kernel; the CPU provider can't run it
+    providers = ["CUDAExecutionProvider"]
+    if providers[0] not in ort.get_available_providers():
+        print(f"Skipped {dst}: no float16-capable execution provider")
+        return False
+
+    # Halve weight storage, LSTM included; keep float32 I/O so callers feed
+    # the same tensors
+    model_fp16 = convert_float_to_float16(onnx.load(src), keep_io_types=True)
+    onnx.save(model_fp16, dst)
+
+    # Keep the float16 model only if it agrees with the float32 one
+    reference = create_session(src)
+    candidate = create_session(dst, providers=providers)
+    if not outputs_match(reference, candidate, sample_inputs):
+        os.remove(dst)
+        print(f"Skipped {dst}: float16 outputs diverge from float32")
+        return False
+    return True
+
 def create_onnx_model():
     # Create model
     model = SimpleTextGenerator()
     model.eval()
-    
-    # Create dummy input
-    batch_size = 1
+
+    # Create a zero dummy input (tracing only needs shapes) with a realistic
+    # batch; the batch axis stays dynamic
+    batch_size = 8
     seq_length = 32
     input_size = 256
-    x = torch.randn(batch_size, seq_length, input_size)
-    
+    x = torch.zeros(batch_size, seq_length, input_size)
+
     # Export to ONNX
-    export(model, x, "models/text-generation.onnx",
+    output_path = "models/text-generation.onnx"
+    export(model, x, output_path,
+           dynamo=False,
+           opset_version=17,
+           do_constant_folding=True,
            input_names=["input"],
            output_names=["output"],
            dynamic_axes={
                "input": {0: "batch_size", 1: "sequence_length"},
                "output": {0: "batch_size"}
            })
-    
+
+    # Optimize the exported graph offline
+    optimize_onnx_model(output_path)
+
+    # Seeded inputs for the variant parity checks, so the keep/drop decision
+    # is the same on every build
+    rng = np.random.default_rng(0)
+    sample_inputs = [
+        {"input": rng.standard_normal((n, seq_length, input_size), dtype=np.float32)}
+        for n in (1, 4)
+    ]
+
+    # Write a float16 variant for targets with native half-precision support
+    convert_to_fp16(output_path, output_path.replace(".onnx", ".fp16.onnx"), sample_inputs)
+
+    # Write an int8 variant for CPU inference
+    quantize(output_path, output_path.replace(".onnx", ".int8.onnx"), sample_inputs)
+
     print("ONNX model created successfully")
 
 if __name__ == "__main__":
@@ -0,0 +1,65 @@
+import os
+import numpy as np
+import onnx
+import onnxruntime as ort
+from onnxruntime.quantization import QuantType, quantize_dynamic
+
+def create_session(path, sess_options=None, providers=("CPUExecutionProvider",)):
+    # Pin the provider (CPU unless asked otherwise) and size the thread pool
+    # to the host
+    if sess_options is None:
+        sess_options = ort.SessionOptions()
+        sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    sess_options.intra_op_num_threads = os.cpu_count() or 1
+    sess_options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    return ort.InferenceSession(path, sess_options, providers=list(providers))
+
+def optimize_onnx_model(path):
+    # Validate the exported graph and bake static shape info into it
+    model = onnx.load(path)
+    onnx.checker.check_model(model)
+    model = onnx.shape_inference.infer_shapes(model)
+    onnx.save(model, path)
+
+    # Let ONNX Runtime apply its graph rewrites once, offline, so consumers
+    # don't repeat them at every session init. EXTENDED rather than ALL:
+    # layout optimizations are tied to the build host and not portable.
+    optimized_path = path.replace(".onnx", ".opt.onnx")
+    sess_options = ort.SessionOptions()
+    sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+    sess_options.optimized_model_filepath = optimized_path
+    create_session(path, sess_options)
+
+    # Replace the raw export with the optimized graph
+    os.replace(optimized_path, path)
+
+def outputs_match(reference, candidate, sample_inputs, atol=1e-2):
+    # Compare every output of two sessions on the same feeds
+    for feed in sample_inputs:
+        expected = reference.run(None, feed)
+        actual = candidate.run(None, feed)
+        if not all(np.allclose(e, a, atol=atol) for e, a in zip(expected, actual)):
+            return False
+    return True
+
+def is_quantized(path):
+    # quantize_dynamic emits DynamicQuantize* / *Integer ops for what it converts
+    return any(node.op_type.startswith("DynamicQuantize") or node.op_type.endswith("Integer")
+               for node in onnx.load(path).graph.node)
+
+def quantize(src, dst, sample_inputs):
+    # Int8 weights; activations are quantized on the fly at run time
+    quantize_dynamic(src, dst, weight_type=QuantType.QInt8)
+
+    # Don't ship a float copy under an int8 name
+    if not is_quantized(dst):
+        os.remove(dst)
+        print(f"Skipped {dst}: no operators were quantized")
+        return False
+
+    # Keep the int8 model only if it agrees with the float32 one
+    if not outputs_match(create_session(src), create_session(dst), sample_inputs):
+        os.remove(dst)
+        print(f"Skipped {dst}: int8 outputs diverge from float32")
+        return False
+    return True
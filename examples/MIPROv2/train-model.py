@@ -3,6 +3,7 @@ import torch.nn as nn
 import torch.optim as optim
 from torch.utils.data import Dataset, DataLoader
 from torch.onnx import export
+from onnx_utils import optimize_onnx_model, quantize
 import numpy as np
 
 class TextDataset(Dataset):
@@ -11,22 +12,22 @@ class TextDataset(Dataset):
         self.contexts = contexts
         self.max_length = max_length
         
+        # Simple byte-level tokenization (in practice, use a proper tokenizer),
+        # done once up front into a single [N, max_length] tensor
+        encoded = [
+            f"Context: {context}\nInput: {text}"[:max_length].encode('latin-1', 'replace')
+            for text, context in zip(texts, contexts)
+        ]
+        buffer = b"".join(e.ljust(max_length, b"\0") for e in encoded)
+        tokens = np.frombuffer(buffer, dtype=np.uint8).reshape(len(encoded), max_length)
+        self.tokens = torch.from_numpy(tokens.astype(np.float32) * np.float32(1.0 / 255.0))
+        
     def __len__(self):
         return len(self.texts)
     
     def __getitem__(self, idx):
-        text = self.texts[idx]
-        context = self.contexts[idx]
-        
-        # Simple tokenization (in practice, use a proper tokenizer)
-        combined = f"Context: {context}\nInput: {text}"
-        tokens = [ord(c) / 255.0 for c in combined[:self.max_length]]
-        tokens = tokens + [0] * (self.max_length - len(tokens))
-        
         # Create target (simple echo for demonstration)
-        target = tokens.copy()
-        
-        return torch.tensor(tokens, dtype=torch.float32), torch.tensor(target, dtype=torch.float32)
+        return self.tokens[idx], self.tokens[idx].clone()
 
 class MIPROv2Model(nn.Module):
     def __init__(self, input_size=128, hidden_size=256, num_layers=2):
@@ -42,40 +43,71 @@ class MIPROv2Model(nn.Module):
         return output.squeeze(-1)  # Remove feature dimension
 
 def train_model(train_data, epochs=10, batch_size=32, learning_rate=0.001):
+    # Train on GPU when available; allow TF32 matmuls on Ampere and newer
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    torch.set_float32_matmul_precision("high")
+    
     # Create dataset
     texts, contexts = zip(*train_data)
     dataset = TextDataset(texts, contexts)
-    dataloader = DataLoader(dataset, batch_size=batch_size, shuffle=True)
+    dataloader = DataLoader(dataset, batch_size=batch_size, shuffle=True, num_workers=0,
+                            pin_memory=(device.type == "cuda"))
     
     # Initialize model
-    model = MIPROv2Model()
+    model = MIPROv2Model().to(device)
+    # Compile on CUDA only, where reduce-overhead captures CUDA graphs. Dynamo
+    # graph-breaks on the LSTM, so it stays eager and only the surrounding
+    # ops are compiled. The eager module shares its parameters and is what
+    # gets returned for export.
+    if device.type == "cuda":
+        compiled_model = torch.compile(model, mode="reduce-overhead")
+    else:
+        compiled_model = model
     criterion = nn.MSELoss()
-    optimizer = optim.Adam(model.parameters(), lr=learning_rate)
+    # Fused kernel on CUDA, multi-tensor (foreach) updates elsewhere; the two
+    # are mutually exclusive
+    use_fused = device.type == "cuda"
+    optimizer = optim.Adam(model.parameters(), lr=learning_rate,
+                           fused=use_fused, foreach=not use_fused)
+    # Mixed precision on GPU only; weights stay float32 for export
+    use_amp = device.type == "cuda"
+    scaler = torch.amp.GradScaler(device.type, enabled=use_amp)
     
     # Training loop
     print("Starting training...")
     for epoch in range(epochs):
-        total_loss = 0
+        # Accumulate on device to avoid a host sync every step
+        total_loss = torch.zeros((), device=device)
         for batch_x, batch_y in dataloader:
-            optimizer.zero_grad()
-            output = model(batch_x)
-            loss = criterion(output, batch_y)
-            loss.backward()
-            optimizer.step()
-            total_loss += loss.item()
+            batch_x = batch_x.to(device, non_blocking=True)
+            batch_y = batch_y.to(device, non_blocking=True)
+            optimizer.zero_grad(set_to_none=True)
+            with torch.autocast(device.type, dtype=torch.float16, enabled=use_amp):
+                output = compiled_model(batch_x)
+                loss = criterion(output, batch_y)
+            scaler.scale(loss).backward()
+            scaler.step(optimizer)
+            scaler.update()
+            total_loss += loss.detach()
         
-        avg_loss = total_loss / len(dataloader)
+        avg_loss = (total_loss / len(dataloader)).item()
         print(f"Epoch {epoch+1}/{epochs}, Loss: {avg_loss:.4f}")
     
     print("Training completed")
-    return model
+    return model, dataset.tokens
 
-def export_to_onnx(model, output_path, input_size=128):
-    model.eval()
-    dummy_input = torch.randn(1, input_size)
+def export_to_onnx(model, output_path, input_size=128, batch_size=8):
+    # Export from CPU so the traced graph doesn't depend on the training device
+    model = model.cpu().eval()
+    # Trace with a realistic batch of zeros; only shapes matter and the batch
+    # axis stays dynamic below
+    dummy_input = torch.zeros(batch_size, input_size)
     
     # Export the model
     export(model, dummy_input, output_path,
+           dynamo=False,
+           opset_version=17,
+           do_constant_folding=True,
            input_names=['input'],
            output_names=['output'],
            dynamic_axes={
@@ -84,6 +116,13 @@ def export_to_onnx(model, output_path, input_size=128):
            })
     print(f"Model exported to {output_path}")
 
+def export_to_torchscript(model, output_path):
+    # Script and freeze for Python-native inference without eager dispatch
+    model = model.cpu().eval()
+    scripted = torch.jit.freeze(torch.jit.script(model))
+    torch.jit.save(scripted, output_path)
+    print(f"Model exported to {output_path}")
+
 def main():
     # Sample training data
     train_data = [
@@ -94,10 +133,19 @@ def main():
     ]
     
     # Train the model
-    model = train_model(train_data)
+    model, tokens = train_model(train_data)
     
     # Export to ONNX
-    export_to_onnx(model, "models/miprov2-model.onnx")
+    output_path = "models/miprov2-model.onnx"
+    export_to_onnx(model, output_path)
+    optimize_onnx_model(output_path)
+
+    # Export to TorchScript for Python-side inference
+    export_to_torchscript(model, output_path.replace(".onnx", ".pt"))
+
+    # Write an int8 variant, checked against the training samples
+    sample_inputs = [{"input": tokens[i:i + 1].numpy()} for i in range(len(tokens))]
+    quantize(output_path, output_path.replace(".onnx", ".int8.onnx"), sample_inputs)
 
 if __name__ == "__main__":
     main()
@@ -1,9 +1,11 @@
+from pathlib import Path
 import numpy as np
+import onnxruntime as ort
 from sklearn.pipeline import Pipeline
 from sklearn.feature_extraction.text import CountVectorizer
 from sklearn.linear_model import LogisticRegression
 import skl2onnx
-from skl2onnx.common.data_types import FloatTensorType
+from skl2onnx.common.data_types import FloatTensorType, StringTensorType
 
 # Sample data
 texts = [
@@ -38,17 +40,38 @@ onx = skl2onnx.convert_sklearn(
     options={type(pipeline.named_steps['classifier']): {'zipmap': False}}
 )
 
+# Convert the whole pipeline as well, so tokenization runs inside the graph
+# and callers can feed raw strings without the feature names sidecar
+pipeline_onx = skl2onnx.convert_sklearn(
+    pipeline,
+    'text_classifier_pipeline',
+    initial_types=[('input', StringTensorType([None, 1]))],
+    options={type(pipeline.named_steps['classifier']): {'zipmap': False}}
+)
+
+# Check the in-graph tokenizer against sklearn: skl2onnx swaps in its own
+# regex for CountVectorizer's token pattern
+session = ort.InferenceSession(pipeline_onx.SerializeToString(),
+                               providers=["CPUExecutionProvider"])
+probabilities = session.run(['probabilities'],
+                            {'input': np.array(texts).reshape(-1, 1)})[0]
+pipeline_matches = np.allclose(probabilities, pipeline.predict_proba(texts), atol=1e-4)
+
 # Save model and metadata
-import os
-os.makedirs('models', exist_ok=True)
+models_dir = Path('models')
+models_dir.mkdir(exist_ok=True)
 
 # Save model
-with open("models/text-classifier.onnx", "wb") as f:
-    f.write(onx.SerializeToString())
+(models_dir / "text-classifier.onnx").write_bytes(onx.SerializeToString())
+
+# Save end-to-end model (string input), only if it agrees with sklearn
+if pipeline_matches:
+    (models_dir / "text-classifier.pipeline.onnx").write_bytes(pipeline_onx.SerializeToString())
+else:
+    print("Skipped text-classifier.pipeline.onnx: outputs diverge from sklearn")
 
 # Save feature names
-with open("models/feature_names.txt", "w") as f:
-    f.write("\n".join(feature_names))
+(models_dir / "feature_names.txt").write_text("\n".join(feature_names))
 
 print("Model and features saved to models/")
 print(f"Number of features: {n_features}")